@@ -1,13 +1,19 @@
 from __future__ import annotations  # 타입 힌트 안정화
 import json  # 더미 캡션/본문 만들 때 사용
 import os  # 환경변수 읽기(실모드에서만 필요)
-from dataclasses import dataclass  # 클래스 간단 정의
+from dataclasses import dataclass, field  # 클래스 간단 정의
 from pathlib import Path  # 경로 처리
 from typing import Any, Dict, List  # 타입 힌트
 
+from app.config_loader import cache_per_config  # factory 결과 캐시
 from app.drive_manager import DriveImage  # DriveImage 재사용
 
 
+_BASE_DIR = Path(__file__).resolve().parent.parent  # 프로젝트 루트(import 시 한 번만 계산)
+_MOCK_LINE1 = "(더미) 사진 {} 한 줄 소개"  # 더미 캡션 첫 줄 템플릿
+_MOCK_LINE2 = "(더미) 사진 {} 두 번째 줄 소개"  # 더미 캡션 둘째 줄 템플릿
+
+
 @dataclass
 class AIProcessor:  # AI 처리(실제 호출 or 더미 생성) 담당
     provider: str  # "gemini" 등
@@ -15,12 +21,18 @@ class AIProcessor:  # AI 처리(실제 호출 or 더미 생성) 담당
     api_key: str | None  # ✅ 더미모드면 None 가능
     prompts_dir: Path  # prompts 폴더 경로
     mock_mode: bool = False  # ✅ 더미모드 플래그
+    _prompt_cache: Dict[str, str] = field(default_factory=dict, init=False, repr=False)  # 파일명 -> 프롬프트 텍스트 캐시
 
-    def _read_prompt(self, filename: str) -> str:  # 프롬프트 파일 읽기
+    def _read_prompt(self, filename: str) -> str:  # 프롬프트 파일 읽기(인스턴스당 한 번)
+        cached = self._prompt_cache.get(filename)  # 이미 읽은 적 있으면
+        if cached is not None:  # 캐시 히트
+            return cached  # 파일 I/O 없이 반환
         path = self.prompts_dir / filename  # prompts/filename 경로
         if not path.exists():  # 파일 없으면
             raise FileNotFoundError(f"Missing prompt file: {path}")  # 에러
-        return path.read_text(encoding="utf-8")  # 텍스트 반환
+        text = path.read_text(encoding="utf-8")  # 텍스트 읽기
+        self._prompt_cache[filename] = text  # 캐시 저장
+        return text  # 텍스트 반환
 
     # -----------------------------
     # ✅ 더미 생성 로직 (결제/쿼터 없어도 계속 개발 가능)
@@ -28,27 +40,22 @@ class AIProcessor:  # AI 처리(실제 호출 or 더미 생성) 담당
     def _mock_captions(self, images: List[DriveImage]) -> Dict[str, Any]:  # 더미 캡션 JSON 생성
         return {  # 요구 스키마 유지
             "images": [
-                {
-                    "index": idx,  # 1부터 시작
-                    "line1": f"(더미) 사진 {idx} 한 줄 소개",  # 첫 줄
-                    "line2": f"(더미) 사진 {idx} 두 번째 줄 소개",  # 둘째 줄
-                }
+                {"index": idx, "line1": _MOCK_LINE1.format(idx), "line2": _MOCK_LINE2.format(idx)}  # 1부터 시작, 템플릿으로 두 줄 생성
                 for idx in range(1, len(images) + 1)  # 이미지 개수만큼 생성
             ]
         }
 
     def _mock_post(self, captions_json: Dict[str, Any]) -> str:  # 더미 본문 생성(마크다운/텍스트)
-        lines = []  # 출력 라인 모음
-        lines.append("더미 제목: 자동 블로그 포스팅 테스트")  # 제목(plain text)
-        lines.append("")  # 빈 줄
-        lines.append("오늘은 자동화 파이프라인을 더미모드로 테스트했어.")  # 1문단
-        lines.append("")  # 빈 줄
-        lines.append("사진별 요약:")  # 섹션 라벨
-        for item in captions_json.get("images", []):  # 캡션 리스트 순회
-            lines.append(f"- 사진 {item['index']}: {item['line1']} / {item['line2']}")  # 간단 요약
-        lines.append("")  # 빈 줄
-        lines.append("마무리: AI 연결되면 여기 내용이 실제 글로 바뀔 거야.")  # 마무리
-        return "\n".join(lines)  # 문자열로 합쳐 반환
+        summary = "".join(  # 캡션 리스트 -> 사진별 간단 요약 줄
+            f"- 사진 {item['index']}: {item['line1']} / {item['line2']}\n" for item in captions_json.get("images", [])
+        )
+        return (  # 제목(plain text) + 1문단 + 요약 + 마무리를 한 번에 합쳐 반환
+            "더미 제목: 자동 블로그 포스팅 테스트\n\n"
+            "오늘은 자동화 파이프라인을 더미모드로 테스트했어.\n\n"
+            "사진별 요약:\n"
+            f"{summary}\n"
+            "마무리: AI 연결되면 여기 내용이 실제 글로 바뀔 거야."
+        )
 
     # -----------------------------
     # ✅ 외부에서 쓰는 메인 함수 2개
@@ -72,14 +79,14 @@ class AIProcessor:  # AI 처리(실제 호출 or 더미 생성) 담당
         raise RuntimeError("Real AI mode is disabled for now. Set ai.mock_mode=true to continue development.")  # 안내
 
 
+@cache_per_config  # 같은 config면 같은 인스턴스 재사용
 def create_ai_processor(config: Dict[str, Any]) -> AIProcessor:  # config로 AIProcessor 생성
     ai_cfg = config.get("ai", {})  # ai 섹션
     provider = ai_cfg.get("provider", "gemini")  # 기본값
     model = ai_cfg.get("model", "gemini-2.0-flash")  # 기본값
     mock_mode = bool(ai_cfg.get("mock_mode", False))  # ✅ 더미모드 여부
 
-    base_dir = Path(__file__).resolve().parent.parent  # 프로젝트 루트
-    prompts_dir = base_dir / "prompts"  # prompts 폴더
+    prompts_dir = _BASE_DIR / "prompts"  # prompts 폴더
 
     api_key = None  # ✅ 더미모드면 키 없어도 됨
     if not mock_mode:  # 실모드일 때만 키 요구
@@ -103,7 +110,7 @@ if __name__ == "__main__":  # 단독 테스트(더미 캡션+더미 본문 출
 
     cfg = load_config()  # config 로드
     service = _build_drive_service()  # Drive service 생성
-    state = create_state_client(cfg)  # state client 생성
+    state = create_state_client(cfg, service)  # state client 생성(같은 service 재사용)
     dm = create_drive_manager(cfg, service)  # drive manager 생성
 
     new_imgs = dm.pick_new_images(state)  # 신규 이미지 선택
@@ -1,14 +1,23 @@
 from __future__ import annotations  # (선택) 타입힌트 호환성 안정화
+import copy  # _deep_merge에서 base 깊은 복사용
+import functools  # load_config 결과 캐시(lru_cache)용
+from collections import OrderedDict  # factory 캐시 LRU 순서
 from pathlib import Path  # 경로를 OS 독립적으로 다루기 위한 모듈
-from typing import Any, Dict  # 타입힌트용
+from typing import Any, Callable, Dict, Tuple, TypeVar  # 타입힌트용
 import yaml  # YAML 파싱 모듈 (pip install pyyaml 필요)
 
+Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)  # libyaml(C) 로더가 있으면 사용, 없으면 순수 파이썬 SafeLoader
+_BASE_DIR = Path(__file__).resolve().parent.parent  # 프로젝트 루트(import 시 한 번만 계산)
+
+T = TypeVar("T")  # factory 반환 타입
+FACTORY_CACHE_SIZE = 4  # cache_per_config가 기억할 config 최대 개수
+
 
 def _read_yaml(path: Path) -> Dict[str, Any]:  # YAML 파일을 dict로 읽는 내부 함수
     if not path.exists():  # 파일이 없으면
         return {}  # 선택 파일(paths.yaml 등)은 없어도 되게 빈 dict 반환
     with path.open("r", encoding="utf-8") as f:  # UTF-8로 파일 열기
-        data = yaml.safe_load(f)  # YAML -> Python 객체(dict 등)로 변환
+        data = yaml.load(f, Loader=Loader)  # YAML -> Python 객체(dict 등)로 변환(safe_load와 동일 의미)
     if data is None:  # 파일이 비어있거나 null이면
         return {}  # 빈 dict로 통일
     if not isinstance(data, dict):  # 최상위가 dict가 아니면(예: 리스트 등)
@@ -16,19 +25,22 @@ def _read_yaml(path: Path) -> Dict[str, Any]:  # YAML 파일을 dict로 읽는 
     return data  # 정상 dict 반환
 
 
-def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:  # dict를 재귀적으로 병합
-    result = dict(base)  # base 얕은 복사(원본 보호)
-    for k, v in override.items():  # override의 모든 키를 순회
-        if k in result and isinstance(result[k], dict) and isinstance(v, dict):  # 둘 다 dict면
-            result[k] = _deep_merge(result[k], v)  # 재귀 병합
-        else:  # 그 외에는
-            result[k] = v  # override 값으로 덮어쓰기
+def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:  # dict를 반복(스택) 방식으로 병합
+    result = copy.deepcopy(base)  # base 전체를 한 번만 깊은 복사(원본 보호)
+    stack = [(result, override)]  # (대상 dict, 덮어쓸 dict) 작업 스택
+    while stack:  # 처리할 쌍이 남아있는 동안
+        dst, src = stack.pop()  # 하나 꺼내기
+        for k, v in src.items():  # override의 모든 키를 순회
+            if k in dst and isinstance(dst[k], dict) and isinstance(v, dict):  # 둘 다 dict면
+                stack.append((dst[k], v))  # 하위 dict는 스택에 넣어서 이어서 병합
+            else:  # 그 외에는
+                dst[k] = v  # override 값으로 덮어쓰기
     return result  # 병합 결과 반환
 
 
+@functools.lru_cache(maxsize=1)  # 같은 프로세스에서는 한 번만 읽고 파싱(갱신 필요 시 load_config.cache_clear())
 def load_config() -> Dict[str, Any]:  # config를 읽어 최종 설정 dict를 반환하는 메인 함수
-    base_dir = Path(__file__).resolve().parent.parent  # blog-pipeline 루트 경로 계산
-    config_dir = base_dir / "config"  # config 폴더 경로
+    config_dir = _BASE_DIR / "config"  # config 폴더 경로
     config_yaml = config_dir / "config.yaml"  # 필수 설정 파일 경로
     paths_yaml = config_dir / "paths.yaml"  # 선택 경로 설정 파일 경로
 
@@ -55,6 +67,26 @@ def load_config() -> Dict[str, Any]:  # config를 읽어 최종 설정 dict를 
     return cfg  # 최종 config 반환
 
 
+def cache_per_config(factory: Callable[[Dict[str, Any]], T]) -> Callable[[Dict[str, Any]], T]:  # create_*(config) 결과를 같은 config 객체 단위로 재사용(최근 FACTORY_CACHE_SIZE개)
+    cache: "OrderedDict[int, Tuple[Dict[str, Any], T]]" = OrderedDict()  # id(config) -> (config, 결과), 오래된 것부터 정렬
+
+    @functools.wraps(factory)
+    def wrapper(config: Dict[str, Any]) -> T:  # config dict는 해시 불가라 객체 id로 키를 만든다
+        key = id(config)  # config 객체 id
+        hit = cache.get(key)  # 캐시 조회
+        if hit is not None and hit[0] is config:  # 같은 객체일 때만(id 재사용 방지)
+            cache.move_to_end(key)  # 최근 사용으로 갱신
+            return hit[1]  # 캐시된 인스턴스 반환
+        result = factory(config)  # 새로 생성
+        cache[key] = (config, result)  # config 참조를 함께 보관(id가 재사용되지 않게)
+        if len(cache) > FACTORY_CACHE_SIZE:  # 상한을 넘으면
+            cache.popitem(last=False)  # 가장 오래된 것 제거(무한 증가 방지)
+        return result  # 결과 반환
+
+    wrapper.cache_clear = cache.clear  # type: ignore[attr-defined]  # load_config.cache_clear()와 같은 방식으로 비우기
+    return wrapper  # 래퍼 반환
+
+
 if __name__ == "__main__":  # 이 파일을 단독 실행할 때만 아래 실행
     config = load_config()  # config 로드
     print(config)  # 로드 결과 출력(테스트용)
@@ -1,14 +1,36 @@
 from __future__ import annotations  # 타입 힌트 안정화
+import functools  # ZoneInfo 캐시
+import os  # 하드링크 생성
 import re  # slug 만들 때 사용
 import shutil  # 파일 복사/이동
+from concurrent.futures import ThreadPoolExecutor  # 이미지 병렬 복사
 from dataclasses import dataclass  # 간단 구조
-from datetime import datetime  # 파일명 날짜
+from datetime import datetime, tzinfo  # 파일명 날짜
 from pathlib import Path  # 경로 처리
-from typing import Any, Dict, List, Tuple  # 타입 힌트
+from typing import Any, Dict, List, Optional, Tuple  # 타입 힌트
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError  # 설정 타임존
 
+from app.config_loader import cache_per_config  # factory 결과 캐시
 from app.drive_manager import DriveImage  # 이미지 구조 재사용
 
 
+_SLUG_WS = re.compile(r"\s+")  # slug: 공백 묶음(미리 컴파일)
+_SLUG_BAD = re.compile(r"[^0-9A-Za-z가-힣\-]+")  # slug: 허용 문자 외(미리 컴파일)
+_BASE_DIR = Path(__file__).resolve().parent.parent  # 프로젝트 루트(import 시 한 번만 계산)
+_POST_WRITE_BUFFER = 1024 * 1024  # 포스트 저장 버퍼 크기(1MB)
+_FRONT_MATTER_TMPL = '---\ntitle: "{title}"\nlayout: post\ncategories: [blog]\n---\n\n'  # Jekyll front matter 템플릿
+_IMAGE_LINE_TMPL = "![]({})\n\n"  # 이미지 한 장 + 빈 줄
+_CAPTION_LINE_TMPL = "- 사진 {}: {}\n  - {}\n"  # 캡션 첫 줄 / 둘째 줄 들여쓰기
+
+
+@functools.lru_cache(maxsize=None)  # 같은 이름의 타임존은 한 번만 로드
+def _zone(name: str) -> Optional[ZoneInfo]:  # 타임존 이름 -> ZoneInfo(찾을 수 없으면 None = 시스템 로컬)
+    try:
+        return ZoneInfo(name)  # tzdata 조회
+    except ZoneInfoNotFoundError:  # Windows에서 tzdata 패키지가 없으면
+        return None  # 로컬 시간으로 대체(파이프라인 생성이 죽지 않게)
+
+
 @dataclass
 class BuildResult:  # content_builder 결과(다음 단계에 넘길 정보)
     post_path: str  # 생성된 마크다운 파일 경로
@@ -20,11 +42,13 @@ class BuildResult:  # content_builder 결과(다음 단계에 넘길 정보)
 class ContentBuilder:  # 마크다운/이미지 파일 생성 담당
     posts_dir: Path  # blog/_posts 경로
     images_dir: Path  # blog/assets/images 경로
+    tz: Optional[tzinfo] = None  # 날짜 기준 타임존(None이면 시스템 로컬)
+    link_images: bool = True  # 가능하면 복사 대신 하드링크(같은 파일시스템일 때)
 
     def _make_slug(self, title: str) -> str:  # 제목 기반 slug 생성
         title = title.strip()  # 앞뒤 공백 제거
-        title = re.sub(r"\s+", "-", title)  # 공백을 -로
-        title = re.sub(r"[^0-9A-Za-z가-힣\-]+", "", title)  # 허용 문자만 남기기
+        title = _SLUG_WS.sub("-", title)  # 공백을 -로
+        title = _SLUG_BAD.sub("", title)  # 허용 문자만 남기기
         title = title.strip("-")  # 양끝 - 제거
         return title[:50] if title else "post"  # 너무 길면 자르고, 비면 post
 
@@ -33,68 +57,64 @@ class ContentBuilder:  # 마크다운/이미지 파일 생성 담당
         return first if first else "Untitled"  # 비면 기본값
 
     def _today_prefix(self) -> str:  # Jekyll 포스트 파일명 prefix 날짜(YYYY-MM-DD)
-        return datetime.now().strftime("%Y-%m-%d")  # 오늘 날짜 반환
+        return datetime.now(self.tz).date().isoformat()  # 설정 타임존 기준 오늘 날짜 반환
 
     def _ensure_dirs(self) -> None:  # 필요한 폴더 생성
         self.posts_dir.mkdir(parents=True, exist_ok=True)  # _posts 폴더 생성
         self.images_dir.mkdir(parents=True, exist_ok=True)  # images 폴더 생성
 
+    def _copy_one(self, img: DriveImage, target_dir: Path) -> str:  # 이미지 1장 복사(워커 스레드에서 실행)
+        if not img.local_path:  # 로컬 경로 없으면
+            raise ValueError(f"Image local_path missing for file_id={img.file_id}")  # 에러
+        src = Path(img.local_path)  # 원본 경로
+        if not src.exists():  # 파일이 없으면
+            raise FileNotFoundError(f"Local image not found: {src}")  # 에러
+        dst = target_dir / src.name  # 대상 경로(파일명 유지)
+        if self.link_images:  # 하드링크 모드면
+            try:
+                dst.unlink(missing_ok=True)  # 같은 이름이 이미 있으면 먼저 제거(link는 덮어쓰기 불가)
+                os.link(src, dst)  # 메타데이터만 추가(데이터 복사 없음)
+                return str(dst)  # 링크 성공
+            except OSError:
+                pass  # 다른 드라이브/미지원 FS면 아래 복사로 대체
+        shutil.copyfile(src, dst)  # 내용 복사(리눅스에서는 sendfile 고속 경로)
+        shutil.copystat(src, dst)  # 메타데이터(수정시각 등) 유지
+        return str(dst)  # 절대/상대 경로 반환(여기선 로컬 경로)
+
     def _copy_images(self, images: List[DriveImage], slug: str) -> List[str]:  # incoming 이미지를 slug 폴더로 정리
         target_dir = self.images_dir / slug  # blog/assets/images/<slug>
         target_dir.mkdir(parents=True, exist_ok=True)  # 폴더 생성
-        out_paths: List[str] = []  # 반환할 경로 리스트
-
-        for img in images:  # 이미지별 처리
-            if not img.local_path:  # 로컬 경로 없으면
-                raise ValueError(f"Image local_path missing for file_id={img.file_id}")  # 에러
-            src = Path(img.local_path)  # 원본 경로
-            if not src.exists():  # 파일이 없으면
-                raise FileNotFoundError(f"Local image not found: {src}")  # 에러
-            dst = target_dir / src.name  # 대상 경로(파일명 유지)
-            shutil.copy2(src, dst)  # 복사(메타데이터 유지)
-            out_paths.append(str(dst))  # 절대/상대 경로 저장(여기선 로컬 경로)
+        if not images:  # 이미지 없으면
+            return []  # 빈 리스트 반환
+
+        with ThreadPoolExecutor(max_workers=min(len(images), 4)) as executor:  # 이미지별 복사를 병렬로
+            out_paths = list(executor.map(lambda img: self._copy_one(img, target_dir), images))  # 입력 순서 유지
 
         return out_paths  # 정리된 이미지 로컬 경로 반환
 
     def _make_markdown(self, title: str, slug: str, captions_json: Dict[str, Any], post_text: str, image_web_paths: List[str]) -> str:  # md 본문 생성
-        lines: List[str] = []  # 라인 리스트
-
         # --- Jekyll front matter (필요 최소) ---
-        lines.append("---")  # 시작
-        lines.append(f'title: "{title}"')  # 제목
-        lines.append("layout: post")  # 레이아웃
-        lines.append("categories: [blog]")  # 카테고리(원하면 config로 뺄 수 있음)
-        lines.append("---")  # 끝
-        lines.append("")  # 빈 줄
+        front_matter = _FRONT_MATTER_TMPL.format(title=title)  # 제목/레이아웃/카테고리(원하면 config로 뺄 수 있음)
 
         # --- 이미지 섹션 ---
+        images_block = ""  # 이미지 없으면 생략
         if image_web_paths:  # 이미지가 있으면
-            lines.append("## 사진")  # 섹션 제목
-            lines.append("")  # 빈 줄
-            for p in image_web_paths:  # 웹 경로 기준으로
-                lines.append(f"![]({p})")  # 마크다운 이미지 삽입
-                lines.append("")  # 이미지 사이 빈 줄
+            images_block = "## 사진\n\n" + "".join(map(_IMAGE_LINE_TMPL.format, image_web_paths))  # 웹 경로 기준 마크다운 이미지 + 사이 빈 줄
 
         # --- 캡션 섹션(2줄 소개) ---
+        captions_block = ""  # 캡션 없으면 생략
         images = captions_json.get("images", [])  # 캡션 리스트
         if images:  # 있으면
-            lines.append("## 사진 한줄/두줄 소개")  # 섹션 제목
-            lines.append("")  # 빈 줄
-            for item in images:  # 각 캡션
-                idx = item.get("index")  # 인덱스
-                l1 = item.get("line1", "")  # 첫 줄
-                l2 = item.get("line2", "")  # 둘째 줄
-                lines.append(f"- 사진 {idx}: {l1}")  # 첫 줄 출력
-                lines.append(f"  - {l2}")  # 둘째 줄 들여쓰기
-            lines.append("")  # 빈 줄
+            captions_block = (  # 섹션 제목 + 각 캡션(첫 줄 / 둘째 줄 들여쓰기) + 빈 줄
+                "## 사진 한줄/두줄 소개\n\n"
+                + "".join(_CAPTION_LINE_TMPL.format(item.get("index"), item.get("line1", ""), item.get("line2", "")) for item in images)
+                + "\n"
+            )
 
         # --- 본문 ---
-        lines.append("## 본문")  # 섹션 제목
-        lines.append("")  # 빈 줄
-        lines.append(post_text.strip())  # AI가 준 본문(더미든 실제든)
-        lines.append("")  # 마지막 빈 줄
+        body_block = f"## 본문\n\n{post_text.strip()}\n"  # AI가 준 본문(더미든 실제든)
 
-        return "\n".join(lines)  # 최종 md 문자열 반환
+        return "".join((front_matter, images_block, captions_block, body_block))  # 최종 md 문자열 반환
 
     def build(self, captions_json: Dict[str, Any], post_text: str, images: List[DriveImage]) -> BuildResult:  # 외부에서 호출하는 메인 함수
         self._ensure_dirs()  # 폴더 준비
@@ -111,17 +131,25 @@ class ContentBuilder:  # 마크다운/이미지 파일 생성 담당
         post_path = self.posts_dir / post_filename  # 실제 파일 경로
 
         md = self._make_markdown(title, slug, captions_json, post_text, image_web_paths)  # md 생성
-        post_path.write_text(md, encoding="utf-8")  # 파일 저장
+        with open(os.fspath(post_path), "w", encoding="utf-8", buffering=_POST_WRITE_BUFFER) as f:  # 큰 버퍼로 열기
+            f.write(md)  # 한 번에 저장(write syscall 최소화)
 
         return BuildResult(post_path=str(post_path), post_slug=slug, image_paths=copied_local_paths)  # 결과 반환
 
 
+@cache_per_config  # 같은 config면 같은 인스턴스 재사용
 def create_content_builder(config: Dict[str, Any]) -> ContentBuilder:  # config로 ContentBuilder 생성
-    base_dir = Path(__file__).resolve().parent.parent  # 프로젝트 루트
     blog_cfg = config.get("blog", {})  # blog 섹션
     posts_path = blog_cfg.get("posts_path", "blog/_posts")  # posts 경로 기본값
     images_path = blog_cfg.get("images_path", "blog/assets/images")  # images 경로 기본값
-    return ContentBuilder(posts_dir=base_dir / posts_path, images_dir=base_dir / images_path)  # 객체 생성
+    link_images = bool(blog_cfg.get("link_images", True))  # 하드링크 사용 여부(기본 사용)
+    tz_name = config.get("project", {}).get("timezone", "Asia/Seoul")  # 타임존 기본 Asia/Seoul
+    return ContentBuilder(  # 객체 생성
+        posts_dir=_BASE_DIR / posts_path,  # posts 경로
+        images_dir=_BASE_DIR / images_path,  # images 경로
+        tz=_zone(tz_name),  # 날짜 타임존
+        link_images=link_images,  # 하드링크 여부
+    )
 
 
 if __name__ == "__main__":  # 단독 테스트(Drive->더미AI->md생성)
@@ -133,7 +161,7 @@ if __name__ == "__main__":  # 단독 테스트(Drive->더미AI->md생성)
 
     cfg = load_config()  # config 로드
     service = _build_drive_service()  # Drive service 생성
-    state = create_state_client(cfg)  # state client 생성
+    state = create_state_client(cfg, service)  # state client 생성(같은 service 재사용)
     dm = create_drive_manager(cfg, service)  # drive manager 생성
 
     new_imgs = dm.pick_new_images(state)  # 신규 이미지 선택
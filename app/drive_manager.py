@@ -1,16 +1,21 @@
 from __future__ import annotations  # 타입 힌트 안정화
+import hashlib  # 로컬 캐시 파일 md5 비교
 import os  # 폴더 생성/경로 처리를 위해 사용
-from dataclasses import dataclass  # 간단한 데이터 구조 정의
+import threading  # 스레드별 HTTP 객체 보관
+import time  # 목록 캐시 TTL 계산
+from concurrent.futures import ThreadPoolExecutor  # 이미지 병렬 다운로드
+from dataclasses import dataclass, field, replace  # 간단한 데이터 구조 정의
 from pathlib import Path  # OS 독립 경로 처리
-from typing import Any, Dict, List, Optional  # 타입 힌트
+from typing import Any, Dict, Iterator, List, Optional, Tuple  # 타입 힌트
 
-from googleapiclient.http import MediaIoBaseDownload  # Drive 파일 다운로드
-from io import BytesIO  # 메모리 버퍼 다운로드용
-
-from app.state_client import StateClient  # state 확인용
+from app.state_client import DOWNLOAD_CHUNK_SIZE, DRIVE_BUCKET, StateClient  # state 확인용 + 다운로드 청크 크기 + 속도 제한
 
 
 IMAGE_MIME_PREFIX = "image/"  # 이미지 MIME 타입 prefix
+LIST_PAGE_SIZE = 1000  # files.list 한 페이지 최대 개수(Drive 상한)
+_HASH_CHUNK_SIZE = 1024 * 1024  # 로컬 파일 md5 계산 시 읽기 단위(1MB)
+_BASE_DIR = Path(__file__).resolve().parent.parent  # 프로젝트 루트(import 시 한 번만 계산)
+_BAD_FN_TABLE = str.maketrans({c: "_" for c in '<>:"/\\|?*'})  # 윈도우 금지 문자 -> 밑줄 변환표
 
 
 @dataclass
@@ -20,6 +25,8 @@ class DriveImage:  # Drive에서 가져온 이미지 파일 정보(필요 최소
     mime_type: str  # MIME 타입
     modified_time: str  # 수정 시간(정렬 등에 사용 가능)
     local_path: Optional[str] = None  # 다운로드 후 로컬 저장 경로
+    size: Optional[int] = None  # Drive가 알려준 파일 크기(bytes, 없으면 None)
+    md5: Optional[str] = None  # Drive가 알려준 내용 md5(같은 사진 재업로드 감지용)
 
 
 @dataclass
@@ -28,18 +35,40 @@ class DriveManager:  # Drive 폴더에서 신규 이미지를 찾고 다운로
     input_folder_id: str  # 사진 업로드 폴더 ID
     images_root: Path  # 로컬 이미지 저장 루트 경로 (예: blog/assets/images)
     batch_size: int = 4  # 한 번에 처리할 최대 사진 수
-
-    def _list_images_in_folder(self) -> List[DriveImage]:  # 폴더 내 이미지 파일 목록 조회
+    list_cache_ttl_sec: float = 30.0  # 폴더 목록 캐시 유지 시간(초)
+    max_download_workers: int = 8  # 동시 다운로드 상한(Drive 사용자별 QPS 보호)
+    _local: threading.local = field(default_factory=threading.local, init=False, repr=False)  # 스레드 로컬 저장소
+    _list_cache: Dict[Optional[str], Tuple[float, List[DriveImage], Optional[str]]] = field(default_factory=dict, init=False, repr=False)  # page_token -> (조회 시각, 목록, 다음 token) 캐시
+
+    def invalidate_list_cache(self) -> None:  # 폴더 목록 캐시 비우기(다운로드 후 강제 갱신 등)
+        self._list_cache.clear()  # 다음 조회 때 Drive를 다시 호출
+
+    def _list_images_in_folder(self, page_token: Optional[str] = None) -> Tuple[List[DriveImage], Optional[str]]:  # 폴더 내 이미지 한 페이지 조회(오래된 순)
+        cached_entry = self._list_cache.get(page_token)  # 이 페이지 캐시
+        if cached_entry is not None:  # 캐시가 있으면
+            cached_at, cached, next_token = cached_entry  # 조회 시각/목록/다음 token
+            if time.monotonic() - cached_at < self.list_cache_ttl_sec:  # TTL 안이면
+                return [replace(img) for img in cached], next_token  # 복사본 반환(다운로드 시 local_path 수정이 캐시에 번지지 않게)
+
+        DRIVE_BUCKET.acquire()  # 속도 제한
+        resp = self.list_request(page_token).execute()  # 파일 목록 조회 호출
+        return self.cache_list_page(page_token, resp)  # 파싱 + 캐시 저장
+
+    def list_request(self, page_token: Optional[str] = None) -> Any:  # 목록 조회 요청 객체만 생성(배치에 넣을 수 있게 실행은 안 함)
         q = (  # Drive 검색 쿼리
             f"'{self.input_folder_id}' in parents and "  # 특정 폴더 안에서
             "trashed = false and "  # 휴지통 제외
             f"mimeType contains '{IMAGE_MIME_PREFIX}'"  # image/* 만
         )
-        resp = self.drive_service.files().list(  # 파일 목록 조회 호출
+        return self.drive_service.files().list(  # 파일 목록 조회 요청
             q=q,  # 검색 조건
-            fields="files(id,name,mimeType,modifiedTime)",  # 필요한 필드만 요청(속도/권한 최소화)
-            pageSize=200  # 적당히 크게(폴더가 커지면 페이지네이션 추가 가능)
-        ).execute()  # 실행
+            fields="nextPageToken,files(id,name,mimeType,modifiedTime,size,md5Checksum)",  # 필요한 필드만 요청(속도/권한 최소화)
+            orderBy="modifiedTime",  # 오래된 것부터 서버에서 정렬
+            pageSize=LIST_PAGE_SIZE,  # 오래된(처리된) 사진부터 나오므로 최대 크기로 페이지 수 최소화
+            pageToken=page_token,  # 이어서 받을 페이지(None이면 첫 페이지)
+        )
+
+    def cache_list_page(self, page_token: Optional[str], resp: Dict[str, Any]) -> Tuple[List[DriveImage], Optional[str]]:  # files.list 응답을 DriveImage로 변환해 캐시
         files = resp.get("files", [])  # 결과 리스트
         images: List[DriveImage] = []  # 반환용 리스트
         for f in files:  # 파일 순회
@@ -49,48 +78,106 @@ class DriveManager:  # Drive 폴더에서 신규 이미지를 찾고 다운로
                     name=f["name"],  # 파일명
                     mime_type=f.get("mimeType", ""),  # MIME 타입
                     modified_time=f.get("modifiedTime", ""),  # 수정 시간
+                    size=int(f["size"]) if f.get("size") else None,  # 파일 크기(로컬 캐시 확인용)
+                    md5=f.get("md5Checksum"),  # 내용 해시(목록 응답에 포함, 추가 호출 없음)
                 )
             )
-        images.sort(key=lambda x: x.modified_time, reverse=False)  # 오래된 것부터 정렬(원하면 최신부터로 바꿔도 됨)
-        return images  # 이미지 목록 반환
+        next_token = resp.get("nextPageToken")  # 다음 페이지 token(없으면 마지막)
+        self._list_cache[page_token] = (time.monotonic(), [replace(img) for img in images], next_token)  # 캐시 저장
+        return images, next_token  # 이미지 목록 + 다음 token 반환
+
+    def _iter_images_in_folder(self) -> Iterator[DriveImage]:  # 폴더 내 이미지를 페이지 순서대로 하나씩 내보냄(오래된 순)
+        page_token: Optional[str] = None  # 첫 페이지부터
+        while True:  # 소비자가 멈추면 다음 페이지는 요청하지 않음
+            images, page_token = self._list_images_in_folder(page_token)  # 한 페이지 조회
+            yield from images  # 페이지 안 이미지를 하나씩 전달
+            if not page_token:  # 더 이상 페이지가 없으면
+                return  # 종료
 
     def pick_new_images(self, state_client: StateClient) -> List[DriveImage]:  # 신규 이미지만 뽑아서 batch_size개 반환
-        all_images = self._list_images_in_folder()  # 폴더의 전체 이미지 목록
+        processed, seen_md5 = state_client.processed_keys()  # state는 한 번만 읽고 file_id/내용 md5 set으로 조회
         new_images: List[DriveImage] = []  # 신규만 담을 리스트
-        for img in all_images:  # 전체 중에서
-            if not state_client.is_processed(img.file_id):  # state에 없으면(미처리)
-                new_images.append(img)  # 신규로 추가
+        for img in self._iter_images_in_folder():  # 필요한 만큼만 스트리밍 조회
+            if img.file_id in processed:  # 이미 처리한 파일이면
+                if img.md5:  # md5 기록 이전 state 항목도 내용 비교에 쓰도록
+                    seen_md5.add(img.md5)  # 목록에서 본 md5를 처리된 내용으로 추가
+                continue  # 건너뜀
+            if img.md5:  # 내용 해시를 알면
+                if img.md5 in seen_md5:  # 같은 내용을 이미 처리했거나 이번 배치에 있으면
+                    continue  # 다운로드/AI 생략
+                seen_md5.add(img.md5)  # 같은 배치 안 중복도 방지
+            new_images.append(img)  # 신규로 추가
             if len(new_images) >= self.batch_size:  # batch_size만큼 모이면
-                break  # 중단
+                break  # 다음 페이지 요청 없이 종료
         return new_images  # 신규 이미지 리스트 반환
 
     def _safe_filename(self, name: str) -> str:  # 윈도우에서 문제될 수 있는 문자 제거(아주 최소)
-        bad = ['<', '>', ':', '"', '/', '\\', '|', '?', '*']  # 윈도우 금지 문자
-        for ch in bad:  # 금지 문자 순회
-            name = name.replace(ch, "_")  # 밑줄로 치환
-        return name  # 정리된 파일명 반환
-
-    def download_images(self, images: List[DriveImage], subdir: str) -> List[DriveImage]:  # 이미지들을 로컬로 다운로드
-        target_dir = self.images_root / subdir  # 저장 폴더 (예: blog/assets/images/2026-01-23)
-        target_dir.mkdir(parents=True, exist_ok=True)  # 폴더 없으면 생성
-
-        downloaded: List[DriveImage] = []  # 다운로드 완료 리스트
-        for img in images:  # 이미지별 반복
-            safe_name = self._safe_filename(img.name)  # 파일명 정리
-            local_path = target_dir / safe_name  # 로컬 저장 경로 만들기
-
-            request = self.drive_service.files().get_media(fileId=img.file_id)  # 다운로드 요청
-            fh = BytesIO()  # 메모리 버퍼 생성
-            downloader = MediaIoBaseDownload(fh, request)  # 다운로드 객체 생성
+        return name.translate(_BAD_FN_TABLE)  # 금지 문자를 한 번의 스캔으로 밑줄 치환
+
+    def _service_credentials(self) -> Any:  # 서비스 HTTP에 붙은 인증 정보(AuthorizedHttp가 아니면 None)
+        return getattr(self.drive_service._http, "credentials", None)  # 없으면 스레드별 연결을 만들 수 없음
+
+    def _thread_http(self) -> Any:  # 스레드별 전용 HTTP 객체(httplib2.Http는 스레드 공유 불가)
+        http = getattr(self._local, "http", None)  # 이 스레드에 이미 만든 게 있으면
+        if http is None:  # 없으면 새로 생성
+            from google_auth_httplib2 import AuthorizedHttp  # 인증 정보를 붙인 HTTP 래퍼(지연 import)
+            from googleapiclient.http import build_http  # 서비스와 같은 기본값(timeout 60초)의 HTTP 생성
+            creds = self._service_credentials()  # 인증 정보
+            if creds is None:  # 공유 HTTP를 여러 스레드에서 쓰면 안 되므로
+                raise RuntimeError("Drive service has no credentials; cannot build per-thread HTTP")  # download_images는 이 경우 직렬로 받음
+            http = AuthorizedHttp(creds, http=build_http())  # 같은 인증으로 새 연결(타임아웃 포함)
+            self._local.http = http  # 스레드 로컬에 저장
+        return http  # HTTP 객체 반환
+
+    def _is_cached_locally(self, img: DriveImage, local_path: Path) -> bool:  # 같은 파일이 이미 로컬에 있는지(크기+md5)
+        if img.size is None or not img.md5:  # Drive가 크기/해시를 안 주면 비교할 수 없으므로
+            return False  # 다시 받기
+        try:
+            st_size = os.stat(local_path).st_size  # 로컬 파일 크기
+        except OSError:
+            return False  # 없으면 다운로드 필요
+        if st_size <= 0 or st_size != img.size:  # 빈 파일(중단된 다운로드 등)이나 크기가 다르면
+            return False  # 다시 받기(해시 계산 생략)
+        h = hashlib.md5()  # 로컬 파일 내용 해시
+        with open(local_path, "rb") as fh:  # 바이너리로 읽기
+            for chunk in iter(lambda: fh.read(_HASH_CHUNK_SIZE), b""):  # 큰 파일도 메모리에 다 올리지 않게
+                h.update(chunk)  # 해시 갱신
+        return h.hexdigest() == img.md5.lower()  # 같은 이름/크기라도 내용이 같을 때만 재사용
+
+    def _download_one(self, img: DriveImage, target_dir: Path, parallel: bool = True) -> DriveImage:  # 이미지 1장 다운로드(워커 스레드에서 실행)
+        safe_name = self._safe_filename(img.name)  # 파일명 정리
+        local_path = target_dir / safe_name  # 로컬 저장 경로 만들기
+        if self._is_cached_locally(img, local_path):  # 이미 받아둔 파일이면
+            img.local_path = str(local_path)  # 경로만 기록
+            return img  # 다운로드 생략
+
+        from googleapiclient.http import MediaIoBaseDownload  # Drive 파일 다운로드(지연 import)
+        request = self.drive_service.files().get_media(fileId=img.file_id)  # 다운로드 요청(스레드마다 새로 생성)
+        if parallel:  # 워커 스레드에서 실행 중이면
+            request.http = self._thread_http()  # 스레드 전용 HTTP로 교체
+        local_path.unlink(missing_ok=True)  # 기존 파일은 지우고 새 inode에 기록(포스트 폴더에 하드링크된 이전 사진 보호)
+        with open(local_path, "wb") as fh:  # 로컬 파일을 바로 열기(메모리 버퍼 없이)
+            downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)  # 파일 핸들로 직접 청크 기록(큰 청크)
             done = False  # 완료 플래그
             while not done:  # 완료까지 반복
+                DRIVE_BUCKET.acquire()  # 청크 요청마다 속도 제한(워커 스레드 공유)
                 _, done = downloader.next_chunk()  # 다음 청크 다운로드
 
-            with open(local_path, "wb") as f:  # 로컬 파일로 저장
-                f.write(fh.getvalue())  # 버퍼 내용을 파일로 씀
+        img.local_path = str(local_path)  # DriveImage에 로컬 경로 기록
+        return img  # 완료된 이미지 반환
+
+    def download_images(self, images: List[DriveImage], subdir: str) -> List[DriveImage]:  # 이미지들을 로컬로 병렬 다운로드
+        target_dir = self.images_root / subdir  # 저장 폴더 (예: blog/assets/images/2026-01-23)
+        target_dir.mkdir(parents=True, exist_ok=True)  # 폴더 없으면 생성
+        if not images:  # 받을 게 없으면
+            return []  # 빈 리스트 반환
+
+        if self._service_credentials() is None:  # 스레드별 연결을 만들 수 없으면
+            return [self._download_one(img, target_dir, parallel=False) for img in images]  # 서비스 HTTP로 한 장씩(직렬)
 
-            img.local_path = str(local_path)  # DriveImage에 로컬 경로 기록
-            downloaded.append(img)  # 완료 리스트에 추가
+        workers = max(1, min(len(images), self.max_download_workers))  # 동시 다운로드 수(이미지 수와 상한 중 작은 값)
+        with ThreadPoolExecutor(max_workers=workers) as executor:  # 네트워크 대기 시간을 겹쳐서 처리
+            downloaded = list(executor.map(lambda img: self._download_one(img, target_dir), images))  # 입력 순서 유지
 
         return downloaded  # 다운로드된 이미지 리스트 반환
 
@@ -106,15 +193,16 @@ def create_drive_manager(config: Dict[str, Any], drive_service: Any) -> DriveMan
 
     images_path = blog_cfg.get("images_path", "blog/assets/images")  # 이미지 저장 루트 경로
     batch_size = int(pipeline_cfg.get("batch_size", 4))  # 배치 크기(기본 4)
+    max_download_workers = int(pipeline_cfg.get("download_workers", 8))  # 동시 다운로드 상한(기본 8)
 
-    base_dir = Path(__file__).resolve().parent.parent  # 프로젝트 루트 경로
-    images_root = base_dir / images_path  # 실제 로컬 이미지 루트 경로
+    images_root = _BASE_DIR / images_path  # 실제 로컬 이미지 루트 경로
 
     return DriveManager(  # DriveManager 객체 생성
         drive_service=drive_service,  # Drive service 주입
         input_folder_id=input_folder_id,  # Drive 폴더 ID
         images_root=images_root,  # 로컬 저장 루트
         batch_size=batch_size,  # 배치 크기
+        max_download_workers=max_download_workers,  # 동시 다운로드 상한
     )
 
 
@@ -124,7 +212,7 @@ if __name__ == "__main__":  # 단독 실행 테스트(신규 1~4장 다운로드
 
     cfg = load_config()  # config 로드
     service = _build_drive_service()  # Drive service 생성(토큰/서비스계정)
-    state = create_state_client(cfg)  # state client 생성
+    state = create_state_client(cfg, service)  # state client 생성(같은 service 재사용)
     mgr = create_drive_manager(cfg, service)  # drive manager 생성
 
     new_imgs = mgr.pick_new_images(state)  # 신규 이미지 선택
@@ -1,14 +1,18 @@
 from __future__ import annotations  # 타입 힌트 안정화
 import subprocess  # git 커맨드 실행
-from dataclasses import dataclass  # 간단 구조
+from dataclasses import dataclass, field  # 간단 구조
 from pathlib import Path  # 경로 처리
 from typing import Any, Dict, List, Optional  # 타입 힌트
 
 
+_BASE_DIR = Path(__file__).resolve().parent.parent  # 프로젝트 루트(import 시 한 번만 계산)
+
+
 @dataclass
 class GitPublisher:  # git add/commit/push 담당
     repo_dir: Path  # git repo 루트 경로
     branch: str = "main"  # 기본 브랜치
+    _git_checked: bool = field(default=False, init=False, repr=False)  # git/repo 확인 완료 여부(프로세스 내 1회만)
 
     def _run(self, args: List[str]) -> str:  # git 명령 실행 공통 함수
         result = subprocess.run(  # subprocess 실행
@@ -28,38 +32,56 @@ class GitPublisher:  # git add/commit/push 담당
     def ensure_repo(self) -> None:  # 현재 폴더가 git repo인지 확인
         self._run(["git", "rev-parse", "--is-inside-work-tree"])  # git repo면 true 반환
 
-    def has_changes(self) -> bool:  # 커밋할 변경사항이 있는지 확인
-        out = self._run(["git", "status", "--porcelain"])  # 변경사항을 간단 포맷으로 출력
-        return bool(out)  # 비어있지 않으면 변경 있음
+    def ensure_ready(self) -> None:  # git 설치 + repo 여부를 한 번만 확인(다른 단계와 병렬로 미리 호출 가능)
+        if self._git_checked:  # 이미 확인했으면
+            return  # 생략
+        self.ensure_git_available()  # git 확인
+        self.ensure_repo()  # repo 확인
+        self._git_checked = True  # 이후 호출에서는 생략
 
     def add_all(self) -> None:  # 변경 파일 전부 stage
         self._run(["git", "add", "-A"])  # add all
 
-    def commit(self, message: str) -> None:  # 커밋 수행
+    def add_paths(self, paths: List[str]) -> None:  # 지정한 경로만 stage(전체 트리 스캔 없이)
+        self._run(["git", "add", "-A", "--", *paths])  # 해당 경로만 add
+
+    def commit(self, message: str) -> bool:  # 커밋 수행(stage된 것만), 커밋했으면 True
         # 커밋할 것이 없으면 커밋 명령이 실패하므로 사전 체크
-        if not self.has_changes():  # 변경 없으면
-            return  # 그냥 종료
+        if not self._has_staged_changes():  # stage된 변경 없으면
+            return False  # 그냥 종료
         self._run(["git", "commit", "-m", message])  # 커밋 실행
+        return True  # 커밋 완료
+
+    def _has_staged_changes(self) -> bool:  # stage된 변경이 있는지(add -A 이후라 untracked까지 포함)
+        result = subprocess.run(  # 종료코드만 사용(출력 없음)
+            ["git", "diff", "--cached", "--quiet"],  # 0=변경 없음, 1=변경 있음
+            cwd=str(self.repo_dir),  # repo 루트
+            stdout=subprocess.DEVNULL,  # 출력 버림
+            stderr=subprocess.DEVNULL,  # 출력 버림
+        )
+        if result.returncode not in (0, 1):  # 그 외는 실패
+            raise RuntimeError(f"Command failed: git diff --cached --quiet (exit {result.returncode})")  # 에러
+        return result.returncode == 1  # 변경 여부 반환
 
     def push(self) -> None:  # push 수행
         self._run(["git", "push", "origin", self.branch])  # origin 브랜치로 push
 
-    def publish(self, commit_message: str) -> None:  # add + commit + push 한번에
-        self.ensure_git_available()  # git 확인
-        self.ensure_repo()  # repo 확인
-        if not self.has_changes():  # 변경 없으면
+    def publish(self, commit_message: str, paths: Optional[List[str]] = None) -> None:  # add + commit + push 한번에(paths가 있으면 그 경로만)
+        self.ensure_ready()  # git/repo 확인(이미 했으면 생략)
+        if paths:  # 바뀐 경로를 알면
+            self.add_paths(paths)  # 그 경로만 stage
+        else:  # 모르면
+            self.add_all()  # 전체 stage(변경 없으면 아무 일도 안 함)
+        if not self.commit(commit_message):  # stage 결과로 변경 여부 판단 후 커밋(git 1~2회)
             print("No changes to publish.")  # 안내
-            return  # 종료
-        self.add_all()  # stage
-        self.commit(commit_message)  # commit
+            return  # 종료(push 생략)
         self.push()  # push
 
 
 def create_git_publisher(config: Dict[str, Any]) -> GitPublisher:  # config로 GitPublisher 생성
-    base_dir = Path(__file__).resolve().parent.parent  # 프로젝트 루트
     git_cfg = config.get("git", {})  # git 섹션
     branch = git_cfg.get("branch", "main")  # 브랜치 기본 main
-    return GitPublisher(repo_dir=base_dir, branch=branch)  # 객체 생성
+    return GitPublisher(repo_dir=_BASE_DIR, branch=branch)  # 객체 생성
 
 
 if __name__ == "__main__":  # 단독 테스트(변경사항 있으면 커밋+푸시)
@@ -1,12 +1,14 @@
 from __future__ import annotations  # 타입 힌트 안정화
 import subprocess  # git 안전 점검용
+import sys  # 로그 출력
+import time  # 로그 타임스탬프
 import traceback  # 에러 스택 출력용
+from concurrent.futures import ThreadPoolExecutor  # 독립 단계 겹쳐 실행
 from dataclasses import dataclass  # 결과 구조화
-from datetime import datetime  # 타임스탬프 로그
-from typing import Any, Dict, List, Optional  # 타입 힌트
+from typing import Any, Dict, List, Optional, Set  # 타입 힌트
 
 from app.config_loader import load_config  # 설정 로더
-from app.state_client import create_state_client, _build_drive_service  # Drive 인증 + state
+from app.state_client import create_state_client, execute_batch, _build_drive_service  # Drive 인증 + state
 from app.drive_manager import create_drive_manager, DriveImage  # Drive 이미지 관리
 from app.ai_processor import create_ai_processor  # AI(더미/실제)
 from app.content_builder import create_content_builder, BuildResult  # 콘텐츠 생성
@@ -27,48 +29,68 @@ class Pipeline:  # 전체 자동화 엔진(실무급)
     def __init__(self, config: Dict[str, Any]) -> None:  # 생성자
         self.config = config  # 설정 저장
         self._drive_service = _build_drive_service()  # Drive API 서비스 생성(이미 세팅됨)
-        self.state_client = create_state_client(config)  # state client 생성(Drive state.json)
+        self.state_client = create_state_client(config, self._drive_service)  # state client 생성(Drive state.json, 같은 service 재사용)
         self.drive_manager = create_drive_manager(config, self._drive_service)  # drive manager 생성
         self.ai = create_ai_processor(config)  # AI 프로세서 생성(더미모드 포함)
         self.builder = create_content_builder(config)  # content builder 생성
         self.git = create_git_publisher(config)  # git publisher 생성
+        self._last_ts_sec = -1  # 로그 타임스탬프 캐시 기준(초)
+        self._last_ts_str = ""  # 로그 타임스탬프 캐시 문자열
 
     # -----------------------------
     # 로깅(최소지만 실무에서 읽기 좋게)
     # -----------------------------
     def _log(self, level: str, msg: str) -> None:  # 콘솔 로그 출력
-        ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")  # 타임스탬프
-        print(f"[{ts}] [{level}] {msg}")  # 표준 로그 포맷
+        now = int(time.time())  # 초 단위 현재 시각
+        if now != self._last_ts_sec:  # 초가 바뀌었을 때만 다시 포맷
+            self._last_ts_sec = now  # 기준 초 갱신
+            self._last_ts_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(now))  # 타임스탬프 캐시
+        sys.stdout.write(f"[{self._last_ts_str}] [{level}] {msg}\n")  # 표준 로그 포맷(한 번의 write)
 
     # -----------------------------
     # Git 안전 점검 (비밀 파일/토큰이 추적되면 즉시 중단)
     # -----------------------------
-    def _git_is_tracked(self, rel_path: str) -> bool:  # 특정 파일이 git에 tracked인지 확인
+    def _tracked_paths(self, paths: List[str]) -> Set[str]:  # 주어진 경로 중 git에 tracked인 것만 반환(git 1회 실행)
+        args = ["git", "ls-files", "-z", "--", *paths]  # tracked인 경로만 NUL 구분으로 출력
         try:
-            subprocess.run(  # git ls-files로 추적 여부 확인
-                ["git", "ls-files", "--error-unmatch", rel_path],  # tracked면 0, 아니면 non-zero
-                cwd=str(self.git.repo_dir),  # repo 루트
-                capture_output=True,  # 출력 캡처
-                text=True,  # 텍스트 모드
-                encoding="utf-8",  # 인코딩
-                check=True,  # 실패 시 예외
-            )
-            return True  # 여기까지 오면 tracked
-        except Exception:
-            return False  # 예외면 tracked 아님
+            result = subprocess.run(args, cwd=str(self.git.repo_dir), capture_output=True)  # git ls-files로 추적 여부 한 번에 확인
+        except OSError as e:  # git 실행 파일이 없으면
+            raise RuntimeError(f"Command failed: {' '.join(args)}\n{e}") from e  # GitPublisher._run과 같은 형태로 에러
+        if result.returncode != 0:  # repo가 아니거나 git이 실패하면(점검 없이 진행하지 않음)
+            raise RuntimeError(f"Command failed: {' '.join(args)}\nSTDERR:\n{result.stderr.decode('utf-8', 'replace')}")  # GitPublisher._run과 같은 에러
+        return {p.decode("utf-8") for p in result.stdout.split(b"\0") if p}  # 경로 set
 
     def _preflight_security_checks(self) -> None:  # 보안/안전 사전 점검
         # ✅ 비밀 파일들이 절대 tracked면 안 됨
         secrets = ["client_secret.json", "token.json", ".env"]  # 최소 필수 시크릿
+        tracked = self._tracked_paths(secrets)  # 디스크에서 지워졌어도 index에 남아 있으면 잡도록 전부 한 번에 조회(git 1회)
         for s in secrets:  # 시크릿 반복
-            if self._git_is_tracked(s):  # tracked면
+            if s in tracked:  # tracked면
                 raise RuntimeError(f"SECURITY BLOCK: '{s}' is tracked by git. Remove it from git history and add to .gitignore.")  # 즉시 중단
 
     # -----------------------------
     # 파이프라인 단계별 실행
     # -----------------------------
+    def _prefetch_drive_metadata(self) -> None:  # 첫 목록 페이지 + state.json 메타데이터(또는 검색)를 batch 1회로 미리 조회
+        requests = [self.drive_manager.list_request(None)]  # 첫 페이지 목록 요청
+        state_file_id = self.state_client.state_file_id  # config/로컬 캐시로 이미 알고 있으면
+        if state_file_id is not None:  # 아는 경우(일반적인 경우)
+            requests.append(self.state_client.remote_meta_request(state_file_id))  # version/size 확인 요청을 같이
+        else:  # 모르면
+            requests.append(self.state_client.find_state_file_request())  # state.json 검색 요청을 같이
+        responses = execute_batch(self._drive_service, requests)  # 한 번의 HTTP 왕복(요청이 1개면 batch 없이 실행)
+        self.drive_manager.cache_list_page(None, responses[0])  # 목록은 캐시에 넣어두고
+        if state_file_id is not None:  # 메타데이터를 받았으면
+            self.state_client.prime_remote_meta(state_file_id, responses[1])  # 다음 state 조회에서 사용
+        else:  # 검색했으면
+            self.state_client.apply_find_response(responses[1])  # file_id 캐시(없으면 나중에 생성)
+
     def _pick_and_download(self) -> List[DriveImage]:  # 신규 이미지 선택 + 다운로드
         self._log("INFO", "Scanning Google Drive for new images...")  # 로그
+        try:
+            self._prefetch_drive_metadata()  # 메타데이터 요청 묶어서 미리 조회
+        except Exception as e:
+            self._log("WARN", f"Batched Drive prefetch failed, falling back to single calls: {e}")  # 실패해도 아래에서 개별 호출
         new_images = self.drive_manager.pick_new_images(self.state_client)  # state 기반 신규 선택
         if not new_images:  # 없으면
             self._log("INFO", "No new images found. Nothing to do.")  # 로그
@@ -99,18 +121,24 @@ class Pipeline:  # 전체 자동화 엔진(실무급)
         template = git_cfg.get("commit_message_template", "chore: publish {slug}")  # 기본 템플릿
         msg = template.format(slug=build_result.post_slug)  # slug로 치환
         self._log("INFO", f"Publishing to GitHub (branch={self.git.branch})...")  # 로그
-        self.git.publish(msg)  # add+commit+push
+        changed = [build_result.post_path, *build_result.image_paths]  # 이번 실행에서 만든 파일만
+        self.git.publish(msg, paths=changed)  # add(해당 경로만)+commit+push
         self._log("INFO", "GitHub publish done.")  # 로그
 
     def _update_state(self, downloaded: List[DriveImage], slug: str) -> int:  # state.json 업데이트(최종 단계)
         self._log("INFO", "Updating state.json on Google Drive (mark processed)...")  # 로그
         ok_count = 0  # 성공 카운트
-        for img in downloaded:  # 이미지별 기록
-            try:
-                self.state_client.mark_processed(img.file_id, slug)  # 성공 후에만 처리 표시
-                ok_count += 1  # 카운트 증가
-            except Exception as e:
-                self._log("ERROR", f"Failed to mark processed for {img.file_id}: {e}")  # 실패 로그(파이프라인 전체는 성공 처리해도 됨)
+        try:
+            with self.state_client.session() as session:  # state 다운로드 1회, 종료 시 업로드 1회
+                for img in downloaded:  # 이미지별 기록(메모리)
+                    try:
+                        session.mark(img.file_id, slug, img.md5)  # 성공 후에만 처리 표시(내용 md5 포함)
+                        ok_count += 1  # 카운트 증가
+                    except Exception as e:
+                        self._log("ERROR", f"Failed to mark processed for {img.file_id}: {e}")  # 한 건 실패가 업로드를 막지 않게
+        except Exception as e:
+            ok_count = 0  # 다운로드/업로드 실패면 아무 것도 기록되지 않음
+            self._log("ERROR", f"Failed to update state.json: {e}")  # 실패 로그(파이프라인 전체는 성공 처리해도 됨)
         self._log("INFO", f"State updated for {ok_count}/{len(downloaded)} image(s).")  # 로그
         return ok_count  # 기록 성공 수 반환
 
@@ -128,7 +156,9 @@ class Pipeline:  # 전체 자동화 엔진(실무급)
         downloaded: List[DriveImage] = []  # 다운로드 결과(실패 시 상태값 유지)
         build_result: Optional[BuildResult] = None  # 콘텐츠 결과(실패 시 None)
 
+        background = ThreadPoolExecutor(max_workers=1)  # Drive/AI 단계와 겹쳐 돌릴 git 준비 작업용
         try:
+            git_ready = background.submit(self.git.ensure_ready)  # git/repo 확인은 다운로드·AI와 독립이라 미리 시작
             downloaded = self._pick_and_download()  # 1) 신규 선택 + 다운로드
             if not downloaded:  # 신규 없으면
                 return PipelineResult(ok=True, message="No new images.", processed_count=0)  # 정상 종료
@@ -137,6 +167,7 @@ class Pipeline:  # 전체 자동화 엔진(실무급)
             build_result = self._build_content(captions, post_text, downloaded)  # 3) 콘텐츠 생성
 
             # ✅ 여기까지는 로컬 결과물 생성 단계 (실패해도 state 업데이트 X)
+            git_ready.result()  # git 준비 완료 대기(실패면 여기서 예외)
             self._git_publish(build_result)  # 4) GitHub publish (실패 가능)
 
             # ✅ push 성공 이후에만 state 기록 (가장 중요)
@@ -168,6 +199,8 @@ class Pipeline:  # 전체 자동화 엔진(실무급)
                 post_slug=(build_result.post_slug if build_result else None),
                 errors=errors,
             )
+        finally:
+            background.shutdown(wait=True)  # 백그라운드 작업 정리
 
 
 def run_pipeline() -> PipelineResult:  # 외부에서 한 줄로 실행할 수 있게 래퍼
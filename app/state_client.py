@@ -1,20 +1,82 @@
 from __future__ import annotations  # 타입 힌트 안정화
+import copy  # state 캐시 복사본 반환
 import json  # state.json 직렬화/역직렬화
 import os  # 환경변수 읽기
-from dataclasses import dataclass  # 간단한 데이터 구조용
+import threading  # 속도 제한기 잠금
+import time  # 속도 제한기 시간 계산
+from dataclasses import dataclass, field  # 간단한 데이터 구조용
 from datetime import datetime, timezone  # 처리 시각 기록용(UTC)
 from io import BytesIO  # Drive 다운로드/업로드 버퍼
-from typing import Any, Dict, Optional  # 타입 힌트
+from pathlib import Path  # file_id 로컬 캐시 경로
+from typing import Any, Dict, List, Optional, Set, Tuple  # 타입 힌트
 
-from googleapiclient.discovery import build  # Drive API client 생성
-from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload  # 파일 다운로드/업로드
-from google.oauth2.credentials import Credentials  # OAuth 토큰 기반 인증
-from google.oauth2.service_account import Credentials as SACredentials  # 서비스계정 인증
-from google_auth_oauthlib.flow import InstalledAppFlow  # 로컬 OAuth 로그인 플로우
-from google.auth.transport.requests import Request  # 토큰 갱신 요청
+try:
+    import orjson  # 빠른 JSON (선택 설치: pip install orjson)
+except ImportError:  # 없으면 표준 json 사용
+    orjson = None  # type: ignore[assignment]
+
+# ✅ google API 모듈은 무거워서 실제로 쓰는 함수 안에서 import
 
 
 SCOPES = ["https://www.googleapis.com/auth/drive"]  # Drive 읽기/쓰기 권한(최소 필요 권한)
+BATCH_LIMIT = 100  # Drive batch 요청 1회당 최대 요청 수
+DOWNLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 다운로드 청크 크기(기본 100KB 대신 8MB → 사진 1장을 1~2회 요청으로)
+
+
+class TokenBucket:  # 초당 요청 수를 미리 맞추는 토큰 버킷(429 후 backoff 대신 사전 조절, 스레드 안전)
+    def __init__(self, rate: float, capacity: float) -> None:  # rate=초당 토큰, capacity=최대 누적
+        self.rate = rate  # 초당 보충량
+        self.capacity = capacity  # 버킷 크기(순간 허용량)
+        self._tokens = capacity  # 처음엔 가득
+        self._updated = time.monotonic()  # 마지막 보충 시각
+        self._lock = threading.Lock()  # 워커 스레드 공유
+
+    def acquire(self, n: float = 1) -> None:  # 토큰 n개가 생길 때까지 대기 후 사용
+        n = min(n, self.capacity)  # 버킷보다 큰 요청은 가득 찰 때까지만 대기(영원히 막히지 않게)
+        while True:  # 부족하면 기다렸다가 다시 확인
+            with self._lock:  # 잠금
+                now = time.monotonic()  # 현재 시각
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)  # 지난 시간만큼 보충
+                self._updated = now  # 보충 시각 갱신
+                if self._tokens >= n:  # 충분하면
+                    self._tokens -= n  # 사용
+                    return  # 바로 진행
+                wait = (n - self._tokens) / self.rate  # 부족분이 찰 때까지 시간
+            time.sleep(wait)  # 잠금 밖에서 대기
+
+
+DRIVE_BUCKET = TokenBucket(rate=8, capacity=8)  # Drive 호출 속도 제한(사용자당 쿼터 아래로)
+
+
+class _PresizedBuffer:  # 크기를 미리 알고 있는 다운로드용 쓰기 버퍼(BytesIO처럼 write만 지원)
+    def __init__(self, size: int) -> None:  # size 바이트 미리 할당
+        self._buf = bytearray(size)  # 한 번에 할당
+        self._len = 0  # 실제로 쓴 길이
+
+    def write(self, data: bytes) -> int:  # MediaIoBaseDownload가 청크마다 호출
+        end = self._len + len(data)  # 쓰기 후 끝 위치
+        if end > len(self._buf):  # 메타데이터보다 크면(드묾)
+            self._buf.extend(bytes(end - len(self._buf)))  # 부족한 만큼만 늘림
+        self._buf[self._len:end] = data  # 제자리 복사
+        self._len = end  # 길이 갱신
+        return len(data)  # 쓴 바이트 수
+
+    def getvalue(self) -> bytes:  # 받은 내용 반환(json/orjson 모두 bytearray를 그대로 파싱)
+        if self._len < len(self._buf):  # 예상보다 적게 받았으면
+            del self._buf[self._len:]  # 남는 뒷부분만 잘라냄
+        return self._buf  # type: ignore[return-value]  # 복사 없이 그대로 반환
+
+
+def _dump_json(obj: Any) -> bytes:  # dict -> 공백 없는 UTF-8 JSON bytes(orjson 있으면 사용)
+    if orjson is not None:  # orjson 설치돼 있으면
+        return orjson.dumps(obj)  # 바로 bytes(들여쓰기 없음)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")  # 표준 json(들여쓰기 없음)
+
+
+def _load_json(data: bytes) -> Any:  # UTF-8 JSON bytes -> 객체(orjson 있으면 사용)
+    if orjson is not None:  # orjson 설치돼 있으면
+        return orjson.loads(data)  # bytes 그대로 파싱
+    return json.loads(data.decode("utf-8"))  # 표준 json
 
 
 @dataclass
@@ -23,25 +85,91 @@ class StateClient:  # state.json을 Drive에서 관리하는 클라이언트
     state_folder_id: str  # state.json이 위치할 Drive 폴더 ID
     state_file_name: str = "state.json"  # state 파일명 기본값
     state_file_id: Optional[str] = None  # state.json의 Drive 파일 ID(찾아두면 캐시)
+    id_cache_path: Optional[Path] = None  # file_id를 실행 간에 기억할 로컬 파일(None이면 사용 안 함)
+    _state_cache: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False)  # 마지막으로 읽거나 올린 state
+    _state_revision: Optional[str] = field(default=None, init=False, repr=False)  # 캐시 시점의 Drive 파일 version
+    _prefetched_meta: Optional[Tuple[str, Dict[str, Any]]] = field(default=None, init=False, repr=False)  # batch로 미리 받은 (file_id, 메타데이터), 다음 조회에서 1회 사용
+    _processed_set: Optional[Set[str]] = field(default=None, init=False, repr=False)  # 캐시된 state의 file_id set(필요할 때 한 번 생성)
+    _md5_set: Optional[Set[str]] = field(default=None, init=False, repr=False)  # 캐시된 state의 이미지 md5 set
+
+    def _load_cached_file_id(self) -> Optional[str]:  # 로컬에 기억해둔 state file_id 읽기
+        if self.id_cache_path is None:  # 캐시 경로 없으면
+            return None  # 사용 안 함
+        try:
+            file_id = self.id_cache_path.read_text(encoding="utf-8").strip()  # 한 줄짜리 파일
+        except OSError:
+            return None  # 없거나 못 읽으면 Drive에서 검색
+        return file_id or None  # 빈 파일이면 None
+
+    def _save_cached_file_id(self, file_id: str) -> None:  # 찾은/만든 state file_id를 로컬에 기억
+        if self.id_cache_path is None:  # 캐시 경로 없으면
+            return  # 사용 안 함
+        try:
+            self.id_cache_path.parent.mkdir(parents=True, exist_ok=True)  # 폴더 생성
+            self.id_cache_path.write_text(file_id, encoding="utf-8")  # 저장
+        except OSError:
+            pass  # 캐시 저장 실패는 치명적이지 않음(다음에 다시 검색)
+
+    def forget_state_file_id(self) -> None:  # file_id 캐시(메모리+로컬) 폐기(파일이 지워졌을 때 등)
+        self.state_file_id = None  # 메모리 캐시 삭제
+        self._prefetched_meta = None  # 미리 받은 메타데이터도 폐기
+        self.invalidate()  # state 캐시도 무효
+        if self.id_cache_path is not None:  # 로컬 캐시가 있으면
+            try:
+                self.id_cache_path.unlink()  # 삭제
+            except OSError:
+                pass  # 없으면 무시
+
+    def invalidate(self) -> None:  # state 캐시 비우기(다음 조회 때 반드시 다시 다운로드)
+        self._state_cache = None  # 캐시 삭제
+        self._state_revision = None  # revision 삭제
+        self._processed_set = None  # file_id set 삭제
+        self._md5_set = None  # md5 set 삭제
+
+    def remote_meta_request(self, file_id: str) -> Any:  # state 파일 메타데이터 요청 객체만 생성(배치에 넣을 수 있게 실행은 안 함)
+        return self.drive_service.files().get(fileId=file_id, fields="version,size,trashed")  # 메타데이터 3필드만
+
+    def prime_remote_meta(self, file_id: str, meta: Dict[str, Any]) -> None:  # batch로 받은 메타데이터를 다음 state 조회에 사용
+        self._prefetched_meta = (file_id, meta)  # 1회용 저장
+
+    def _remote_meta(self, file_id: str) -> Dict[str, Any]:  # Drive 파일 version/size/trashed만 가볍게 조회(내용이 바뀌면 version 증가)
+        prefetched, self._prefetched_meta = self._prefetched_meta, None  # 미리 받은 게 있으면 한 번만 사용
+        if prefetched is not None and prefetched[0] == file_id:  # 같은 파일이면
+            return prefetched[1]  # 추가 왕복 없이 반환
+        DRIVE_BUCKET.acquire()  # 속도 제한
+        return self.remote_meta_request(file_id).execute()  # 메타데이터 조회
 
     def _now_utc_iso(self) -> str:  # 현재 시간을 UTC ISO 문자열로 반환
         return datetime.now(timezone.utc).isoformat()  # 예: 2026-01-23T06:00:00+00:00
 
-    def _find_state_file_id(self) -> Optional[str]:  # 폴더 내 state.json 파일 ID를 찾는다
+    def find_state_file_request(self) -> Any:  # state.json 검색 요청 객체만 생성(배치에 넣을 수 있게 실행은 안 함)
         q = (  # Drive 검색 쿼리 문자열
             f"'{self.state_folder_id}' in parents and "  # 특정 폴더 안에서
             f"name = '{self.state_file_name}' and "  # 파일명이 state.json이고
             "trashed = false"  # 휴지통이 아니면
         )
-        resp = self.drive_service.files().list(q=q, fields="files(id, name)").execute()  # 파일 목록 조회
+        return self.drive_service.files().list(q=q, fields="files(id)", pageSize=1)  # id만, 1건만 요청
+
+    def apply_find_response(self, resp: Dict[str, Any]) -> Optional[str]:  # 검색 응답에서 file_id를 꺼내 캐시
+        files = resp.get("files", [])  # 결과에서 files 추출
+        if not files:  # 없으면
+            return None  # None 반환(ensure_state_file에서 생성)
+        self.state_file_id = files[0]["id"]  # 첫 번째 파일 ID 캐시(동명이 파일 여러 개면 첫 번째 사용)
+        self._save_cached_file_id(self.state_file_id)  # 다음 실행을 위해 로컬에도 기억
+        return self.state_file_id  # file_id 반환
+
+    def _find_state_file_id(self) -> Optional[str]:  # 폴더 내 state.json 파일 ID를 찾는다
+        DRIVE_BUCKET.acquire()  # 속도 제한
+        resp = self.find_state_file_request().execute()  # 파일 목록 조회
         files = resp.get("files", [])  # 결과에서 files 추출
         if not files:  # 없으면
             return None  # None 반환
         return files[0]["id"]  # 첫 번째 파일 ID 반환(동명이 파일 여러 개면 첫 번째 사용)
 
     def _create_empty_state_file(self) -> str:  # 폴더에 state.json이 없으면 새로 만든다
+        from googleapiclient.http import MediaIoBaseUpload  # 업로드 미디어(지연 import)
         empty_state = {"version": 1, "processed": []}  # 최소 state 구조
-        data = json.dumps(empty_state, ensure_ascii=False, indent=2).encode("utf-8")  # JSON bytes 생성
+        data = _dump_json(empty_state)  # JSON bytes 생성
 
         media = MediaIoBaseUpload(BytesIO(data), mimetype="application/json", resumable=False)  # 업로드 미디어 생성
         metadata = {  # Drive 파일 메타데이터
@@ -49,66 +177,172 @@ class StateClient:  # state.json을 Drive에서 관리하는 클라이언트
             "parents": [self.state_folder_id],  # 부모 폴더
             "mimeType": "application/json",  # JSON 파일
         }
+        DRIVE_BUCKET.acquire()  # 속도 제한
         created = self.drive_service.files().create(body=metadata, media_body=media, fields="id").execute()  # 파일 생성
         return created["id"]  # 생성된 파일 ID 반환
 
     def ensure_state_file(self) -> str:  # state.json 파일이 존재하도록 보장하고 file_id를 반환
         if self.state_file_id:  # 이미 캐시되어 있으면
             return self.state_file_id  # 그대로 반환
-        file_id = self._find_state_file_id()  # Drive에서 검색
+        file_id = self._load_cached_file_id()  # 이전 실행에서 기억한 ID(있으면 Drive 검색 생략)
         if file_id is None:  # 없으면
-            file_id = self._create_empty_state_file()  # 새로 생성
+            file_id = self._find_state_file_id()  # Drive에서 검색
+            if file_id is None:  # 없으면
+                file_id = self._create_empty_state_file()  # 새로 생성
+            self._save_cached_file_id(file_id)  # 로컬에 기억
         self.state_file_id = file_id  # 캐시 저장
         return file_id  # file_id 반환
 
-    def download_state(self) -> Dict[str, Any]:  # Drive에서 state.json 내려받아 dict로 반환
+    def download_state(self) -> Dict[str, Any]:  # Drive에서 state.json 내려받아 dict로 반환(바뀌지 않았으면 캐시)
+        return copy.deepcopy(self._fresh_state())  # 호출자가 수정해도 캐시는 안전하게 복사본
+
+    def _fresh_state(self) -> Dict[str, Any]:  # 최신 state 캐시를 보장하고 캐시 dict 자체를 반환(수정 금지)
         file_id = self.ensure_state_file()  # state.json file_id 확보
+        try:
+            meta: Optional[Dict[str, Any]] = self._remote_meta(file_id)  # 현재 Drive version/size
+        except Exception as e:
+            if getattr(getattr(e, "resp", None), "status", None) != 404:  # 404(기억한 ID가 사라짐)가 아니면
+                raise  # 그대로 전달
+            meta = None  # 사라진 파일
+        if meta is None or meta.get("trashed"):  # 지워졌거나 휴지통에 있으면(검색은 trashed = false만 찾음)
+            self.forget_state_file_id()  # 캐시된 ID 폐기
+            file_id = self.ensure_state_file()  # 다시 검색/생성
+            meta = self._remote_meta(file_id)  # 재시도
+        revision = meta.get("version")  # version 문자열
+        if self._state_cache is not None and revision is not None and revision == self._state_revision:  # 캐시 이후 안 바뀌었으면
+            return self._state_cache  # 본문 다운로드 없이 캐시 반환
+        from googleapiclient.http import MediaIoBaseDownload  # 파일 다운로드(지연 import)
         request = self.drive_service.files().get_media(fileId=file_id)  # 다운로드 요청 생성
-        fh = BytesIO()  # 메모리 버퍼
-        downloader = MediaIoBaseDownload(fh, request)  # 다운로드 객체 생성
+        fh = _PresizedBuffer(int(meta.get("size") or 0))  # 크기를 아는 만큼 미리 잡은 버퍼(재할당/복사 없음)
+        downloader = MediaIoBaseDownload(fh, request, chunksize=DOWNLOAD_CHUNK_SIZE)  # 다운로드 객체 생성(큰 청크)
         done = False  # 완료 여부
         while not done:  # 완료될 때까지 반복
+            DRIVE_BUCKET.acquire()  # 청크 요청마다 속도 제한
             _, done = downloader.next_chunk()  # 다음 청크 다운로드
-        content = fh.getvalue().decode("utf-8")  # bytes -> str
-        data = json.loads(content)  # JSON -> dict
+        data = _load_json(fh.getvalue())  # JSON bytes -> dict
         if "processed" not in data or not isinstance(data["processed"], list):  # 필수 구조 검증
             raise ValueError("Invalid state.json: missing 'processed' list")  # 구조가 이상하면 에러
         data.setdefault("version", 1)  # version 없으면 기본 추가
+        self._state_cache = data  # 캐시 저장
+        self._state_revision = revision  # 캐시 시점 version
+        self._processed_set = None  # file_id set은 다음 조회 때 다시 생성
+        self._md5_set = None  # md5 set도 다시 생성
         return data  # state dict 반환
 
     def upload_state(self, state: Dict[str, Any]) -> None:  # dict state를 Drive에 업로드(덮어쓰기)
+        from googleapiclient.http import MediaIoBaseUpload  # 업로드 미디어(지연 import)
         file_id = self.ensure_state_file()  # state.json file_id 확보
-        data = json.dumps(state, ensure_ascii=False, indent=2).encode("utf-8")  # dict -> JSON bytes
+        data = _dump_json(state)  # dict -> JSON bytes
         media = MediaIoBaseUpload(BytesIO(data), mimetype="application/json", resumable=False)  # 업로드 미디어 생성
-        self.drive_service.files().update(fileId=file_id, media_body=media).execute()  # 파일 내용 업데이트
+        DRIVE_BUCKET.acquire()  # 속도 제한
+        updated = self.drive_service.files().update(fileId=file_id, media_body=media, fields="id,version").execute()  # 파일 내용 업데이트(응답은 id/version만)
+        self._state_cache = copy.deepcopy(state)  # 올린 내용으로 캐시 갱신
+        self._processed_set = None  # file_id set은 다음 조회 때 다시 생성
+        self._md5_set = None  # md5 set도 다시 생성
+        self._state_revision = updated.get("version")  # 새 version 기록
 
     def is_processed(self, drive_file_id: str) -> bool:  # 특정 Drive 파일이 이미 처리됐는지 확인
-        state = self.download_state()  # state 다운로드
-        for item in state["processed"]:  # 처리 목록 순회
-            if item.get("file_id") == drive_file_id:  # file_id가 같으면
-                return True  # 이미 처리됨
-        return False  # 처리되지 않음
+        return drive_file_id in self._processed_file_ids()  # set 조회(O(1))
+
+    def _processed_file_ids(self) -> Set[str]:  # 캐시된 state의 file_id set(state가 바뀔 때만 다시 생성)
+        state = self._fresh_state()  # 최신 state(복사 없이)
+        if self._processed_set is None or self._md5_set is None:  # 아직 안 만들었으면
+            self._processed_set = {item["file_id"] for item in state["processed"] if item.get("file_id")}  # 한 번만 생성
+            self._md5_set = {item["md5"] for item in state["processed"] if item.get("md5")}  # 내용 해시도 같이
+        return self._processed_set  # 내부 set(수정 금지)
+
+    def processed_keys(self) -> Tuple[Set[str], Set[str]]:  # (처리된 file_id, 처리된 내용 md5)를 state 조회 1회로 반환
+        ids = self._processed_file_ids()  # set 준비(state 최신화 포함)
+        return set(ids), set(self._md5_set or ())  # 복사본 반환(호출자가 수정해도 안전)
+
+    def processed_ids(self) -> Set[str]:  # 처리된 Drive 파일 ID 전체를 set으로 반환(한 번 다운로드로 여러 건 확인)
+        return set(self._processed_file_ids())  # 캐시된 set의 복사본(호출자가 수정해도 안전)
+
+    def session(self) -> "_StateSession":  # state를 한 번 읽고, 메모리에서 수정 후, 끝날 때 한 번 업로드하는 컨텍스트
+        return _StateSession(client=self)  # with client.session() as s: s.mark(...)
+
+    def mark_processed_bulk(self, entries: List[Tuple[str, str]]) -> int:  # 여러 건을 state 1회 다운로드 + 1회 업로드로 기록
+        with self.session() as s:  # 다운로드 1회
+            added = sum(1 for drive_file_id, post_slug in entries if s.mark(drive_file_id, post_slug))  # 메모리에서만 추가
+        return added  # 추가된 수 반환(업로드는 with 종료 시 1회)
 
     def mark_processed(self, drive_file_id: str, post_slug: str) -> None:  # 처리 완료 기록 추가 후 업로드
-        state = self.download_state()  # state 다운로드
-        if any(item.get("file_id") == drive_file_id for item in state["processed"]):  # 중복 방지
-            return  # 이미 있으면 아무 것도 안 함
-        state["processed"].append({  # 처리 기록 추가
+        self.mark_processed_bulk([(drive_file_id, post_slug)])  # 1건짜리 bulk로 위임
+
+
+@dataclass
+class _StateSession:  # StateClient.session()이 돌려주는 트랜잭션(진입 시 다운로드, 종료 시 변경 있으면 업로드)
+    client: StateClient  # 대상 state client
+    state: Dict[str, Any] = field(default_factory=dict)  # 메모리 상 state
+    dirty: bool = False  # 수정 여부
+    _seen: Set[str] = field(default_factory=set, repr=False)  # 기록된 file_id
+    _now: str = ""  # 이 세션의 처리 시각(같은 배치는 같은 시각)
+
+    def __enter__(self) -> "_StateSession":  # state 한 번 읽기
+        self.state = self.client.download_state()  # 다운로드(캐시 가능)
+        self._seen = {item.get("file_id") for item in self.state["processed"]}  # 이미 기록된 file_id
+        self._now = self.client._now_utc_iso()  # 처리 시각(UTC)
+        self.dirty = False  # 아직 수정 없음
+        return self  # 세션 반환
+
+    def mark(self, drive_file_id: str, post_slug: str, md5: Optional[str] = None) -> bool:  # 처리 기록 추가(메모리만), 새로 추가됐으면 True
+        if drive_file_id in self._seen:  # 중복 방지
+            return False  # 이미 있음
+        entry = {  # 처리 기록
             "file_id": drive_file_id,  # Drive 파일 ID
             "post_slug": post_slug,  # 생성된 포스트 slug
-            "processed_at": self._now_utc_iso(),  # 처리 시각(UTC)
-        })
-        self.upload_state(state)  # 업로드(저장)
+            "processed_at": self._now,  # 처리 시각(UTC)
+        }
+        if md5:  # 내용 해시를 알면
+            entry["md5"] = md5  # 같이 기록(재업로드된 같은 사진 건너뛰기용)
+        self.state["processed"].append(entry)  # 처리 기록 추가
+        self._seen.add(drive_file_id)  # 같은 세션 안 중복도 방지
+        self.dirty = True  # 업로드 필요
+        return True  # 추가됨
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:  # 예외 없이 끝났고 바뀐 게 있으면 업로드
+        if exc_type is None and self.dirty:  # 정상 종료 + 변경 있음
+            self.client.upload_state(self.state)  # 업로드(한 번)
+
+
+def execute_batch(drive_service: Any, requests: List[Any]) -> List[Any]:  # 여러 Drive 메타데이터 요청을 batch HTTP로 묶어 실행(입력 순서대로 응답)
+    responses: List[Any] = [None] * len(requests)  # 결과 자리
+    errors: List[Exception] = []  # 요청별 예외
+
+    def _callback(request_id: str, response: Any, exception: Optional[Exception]) -> None:  # 요청별 응답 수집
+        if exception is not None:  # 실패한 요청이면
+            errors.append(exception)  # 모아뒀다가 끝나고 raise
+        else:
+            responses[int(request_id)] = response  # 입력 순서 자리에 저장
+
+    if len(requests) == 1:  # 하나뿐이면 multipart 오버헤드 없이
+        DRIVE_BUCKET.acquire()  # 속도 제한
+        return [requests[0].execute()]  # 단일 요청으로 실행
+
+    for start in range(0, len(requests), BATCH_LIMIT):  # 배치당 최대 100개
+        batch = drive_service.new_batch_http_request(callback=_callback)  # batch 요청 생성
+        chunk = requests[start:start + BATCH_LIMIT]  # 이번 배치 분량
+        for i, req in enumerate(chunk, start=start):  # 요청 추가
+            batch.add(req, request_id=str(i))  # 인덱스를 request_id로
+        DRIVE_BUCKET.acquire(len(chunk))  # 배치 안 요청도 각각 쿼터를 쓰므로 개수만큼
+        batch.execute()  # 한 번의 HTTP 왕복으로 실행
+    if errors:  # 실패가 있으면
+        raise errors[0]  # 첫 번째 예외 전달
+    return responses  # 응답 목록 반환
 
 
 def _build_drive_service() -> Any:  # Drive API service 객체를 만든다(서비스계정 or OAuth)
+    from googleapiclient.discovery import build  # Drive API client 생성(지연 import)
+
     sa_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")  # 서비스계정 키 JSON 경로(환경변수)
     if sa_path and os.path.exists(sa_path):  # 서비스계정 키가 있으면
+        from google.oauth2.service_account import Credentials as SACredentials  # 서비스계정 인증(이 경로에서만 필요)
         creds = SACredentials.from_service_account_file(sa_path, scopes=SCOPES)  # 서비스계정 creds 생성
-        return build("drive", "v3", credentials=creds)  # drive service 생성
+        return build("drive", "v3", credentials=creds, static_discovery=True)  # drive service 생성(내장 discovery 문서 사용)
 
     token_path = "token.json"  # OAuth 토큰 파일(로컬)
     client_secret_path = "client_secret.json"  # OAuth 클라이언트 시크릿 파일(로컬)
+    from google.oauth2.credentials import Credentials  # OAuth 토큰 기반 인증
     creds: Optional[Credentials] = None  # creds 초기화
 
     if os.path.exists(token_path):  # token.json이 있으면
@@ -116,29 +350,42 @@ def _build_drive_service() -> Any:  # Drive API service 객체를 만든다(서
 
     if not creds or not creds.valid:  # creds가 없거나 유효하지 않으면
         if creds and creds.expired and creds.refresh_token:  # 만료됐고 refresh_token 있으면
+            from google.auth.transport.requests import Request  # 토큰 갱신 요청(갱신할 때만 필요)
             creds.refresh(Request())  # 토큰 갱신
         else:  # 처음 로그인 필요
             if not os.path.exists(client_secret_path):  # client_secret.json이 없으면
                 raise FileNotFoundError(  # 무엇이 필요한지 명확히 안내
                     "Missing OAuth client secret file: client_secret.json (or set GOOGLE_APPLICATION_CREDENTIALS for service account)"
                 )
+            from google_auth_oauthlib.flow import InstalledAppFlow  # 로컬 OAuth 로그인 플로우(최초 로그인 때만 필요)
             flow = InstalledAppFlow.from_client_secrets_file(client_secret_path, SCOPES)  # 로컬 로그인 플로우 준비
             creds = flow.run_local_server(port=0)  # 브라우저 열어서 로그인(자동)
 
         with open(token_path, "w", encoding="utf-8") as f:  # 갱신/발급된 토큰 저장
             f.write(creds.to_json())  # token.json 생성/업데이트
 
-    return build("drive", "v3", credentials=creds)  # drive service 생성
+    return build("drive", "v3", credentials=creds, static_discovery=True)  # drive service 생성(내장 discovery 문서 사용)
 
 
-def create_state_client(config: Dict[str, Any]) -> StateClient:  # config로 StateClient 생성
+def create_state_client(config: Dict[str, Any], drive_service: Any = None) -> StateClient:  # config로 StateClient 생성(서비스가 있으면 재사용)
     drive_cfg = config.get("drive", {})  # config.drive 섹션 가져오기
     folder_id = drive_cfg.get("state_folder_id")  # state_folder_id 읽기
     if not folder_id:  # 없으면
         raise ValueError("config.drive.state_folder_id is required")  # 명확히 에러
     file_name = drive_cfg.get("state_file_name", "state.json")  # 파일명 기본 state.json
-    service = _build_drive_service()  # Drive service 생성
-    return StateClient(drive_service=service, state_folder_id=folder_id, state_file_name=file_name)  # 객체 반환
+    state_file_id = drive_cfg.get("state_file_id") or None  # config에 ID를 직접 적어두면 검색 생략
+    id_cache_path = Path.home() / ".cache" / "hyun" / f"state_file_id-{folder_id}-{file_name}"  # 폴더+파일명별 file_id 로컬 캐시
+    service = drive_service if drive_service is not None else _build_drive_service()  # 이미 만든 service가 있으면 재사용(인증/discovery 1회)
+    client = StateClient(  # 객체 생성
+        drive_service=service,  # Drive service
+        state_folder_id=folder_id,  # state 폴더
+        state_file_name=file_name,  # 파일명
+        state_file_id=state_file_id,  # 알고 있으면 미리 지정
+        id_cache_path=id_cache_path,  # file_id 로컬 캐시
+    )
+    if client.state_file_id is None:  # config에 없으면
+        client.state_file_id = client._load_cached_file_id()  # 로컬 캐시에서 미리 채움(배치 prefetch도 검색 생략)
+    return client  # 객체 반환
 
 
 if __name__ == "__main__":  # 단독 실행 테스트용